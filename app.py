@@ -5,11 +5,9 @@ Description: Upload accident images to predict severity levels
 Run this file: streamlit run app.py
 """
 
+import hashlib
+import io
 import streamlit as st
-from PIL import Image
-import numpy as np
-from model import predict_severity, get_detailed_analysis, get_recommendations
-from utils import preprocess_image, validate_image, get_image_metadata
 
 # Page Configuration
 st.set_page_config(
@@ -19,6 +17,57 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Model and image libraries are only imported once an image is uploaded,
+# keeping the landing page light
+@st.cache_resource
+def _deps():
+    import model
+    import utils
+    return model, utils
+
+# Cache per-upload work so widget reruns don't repeat it.
+# Keyed on a digest of the file; underscore args are not hashed by Streamlit.
+@st.cache_data(show_spinner=False)
+def _analyze(file_hash, _image_bytes):
+    model, utils = _deps()
+    # Decode once; the display thumbnail and model input share the array.
+    # JPEGs decode at the smallest scale still covering the 600px thumbnail
+    img_array = utils.decode_image(_image_bytes, min_size=(600, 600))
+    # decode_image drops alpha, so transparent uploads are thumbnailed
+    # from the PIL image to keep their transparency
+    from PIL import Image
+    header = Image.open(io.BytesIO(_image_bytes))
+    thumb_source = header if header.has_transparency_data else img_array
+    display_image = utils.encode_for_display(
+        utils.create_thumbnail(thumb_source, (600, 600))
+    )
+    severity_class, confidence = model.predict_severity(utils.resize_for_model(img_array))
+    details = model.get_detailed_analysis(severity_class)
+    return display_image, severity_class, confidence, details
+
+@st.cache_data(show_spinner=False)
+def _metadata(file_hash, _image_bytes):
+    from PIL import Image
+    _, utils = _deps()
+    return utils.get_image_metadata(Image.open(io.BytesIO(_image_bytes)))
+
+# Export buttons rerun only this fragment, not the whole inference page
+@st.fragment
+def _export_buttons():
+    col_x, col_y, col_z = st.columns(3)
+    
+    with col_x:
+        if st.button("📄 Generate Report", use_container_width=True):
+            st.info("PDF report generation coming soon!")
+    
+    with col_y:
+        if st.button("📧 Email Results", use_container_width=True):
+            st.info("Email feature coming soon!")
+    
+    with col_z:
+        if st.button("💾 Save Analysis", use_container_width=True):
+            st.info("Save feature coming soon!")
+
 # Custom CSS for better UI
 st.markdown("""
     <style>
@@ -85,25 +134,35 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file is not None:
+    from PIL import Image
+    model, utils = _deps()
+    
     # Load image
+    image_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
     image = Image.open(uploaded_file)
     
     # Validate image
-    is_valid, message = validate_image(image)
+    is_valid, message = utils.validate_image(image, uploaded_file.size)
     
     if not is_valid:
         st.error(message)
     else:
+        # Processing indicator
+        with st.spinner("Analyzing image..."):
+            # Decode, predict and get detailed analysis (cached per upload)
+            display_image, severity_class, confidence, details = _analyze(file_hash, image_bytes)
+        
         # Display uploaded image
         col1, col2 = st.columns([1, 1])
         
         with col1:
             st.subheader("📷 Uploaded Image")
-            st.image(image)
+            st.image(display_image)
             
             # Show image metadata in expander
             with st.expander("📊 Image Details"):
-                metadata = get_image_metadata(image)
+                metadata = _metadata(file_hash, image_bytes)
                 st.write(f"*Dimensions:* {metadata['width']} x {metadata['height']} px")
                 st.write(f"*Format:* {metadata['format']}")
                 st.write(f"*Mode:* {metadata['mode']}")
@@ -113,17 +172,6 @@ if uploaded_file is not None:
         with col2:
             st.subheader("🔍 Analysis Results")
             
-            # Processing indicator
-            with st.spinner("Analyzing image..."):
-                # Preprocess image
-                processed_img = preprocess_image(image)
-                
-                # Get prediction
-                severity_class, confidence = predict_severity(processed_img)
-                
-                # Get detailed analysis
-                details = get_detailed_analysis(severity_class)
-            
             # Display results with color coding
             if "Minor" in severity_class:
                 st.success(f"*Severity Level:* {severity_class}")
@@ -161,7 +209,7 @@ if uploaded_file is not None:
         st.subheader("💡 Recommended Actions")
         
         # Get recommendations
-        recommendations = get_recommendations(severity_class)
+        recommendations = model.get_recommendations(severity_class)
         
         # Display based on severity
         if "Severe" in severity_class:
@@ -235,19 +283,7 @@ if uploaded_file is not None:
         # Download/Export Options
         st.divider()
         
-        col_x, col_y, col_z = st.columns(3)
-        
-        with col_x:
-            if st.button("📄 Generate Report", use_container_width=True):
-                st.info("PDF report generation coming soon!")
-        
-        with col_y:
-            if st.button("📧 Email Results", use_container_width=True):
-                st.info("Email feature coming soon!")
-        
-        with col_z:
-            if st.button("💾 Save Analysis", use_container_width=True):
-                st.info("Save feature coming soon!")
+        _export_buttons()
 
 else:
     # Instructions when no image uploaded
@@ -1,303 +1,232 @@
 """
-Accident Severity Classification - Simple Single Page App
-Author: Gaurav
-Description: Upload accident images to predict severity levels
-Run this file: streamlit run app.py
+Model Logic for Accident Severity Classification
+Handles model loading, predictions, and result interpretation
+Convert the trained model once: python model.py
 """
 
-import streamlit as st
-from PIL import Image
+import os
+import threading
 import numpy as np
-from model import predict_severity, get_detailed_analysis, get_recommendations
-from utils import preprocess_image, validate_image, get_image_metadata
-
-# Page Configuration
-st.set_page_config(
-    page_title="Accident Severity Classifier",
-    page_icon="🚗",
-    layout="centered",
-    initial_sidebar_state="expanded"
-)
-
-# Custom CSS for better UI
-st.markdown("""
-    <style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .description {
-        text-align: center;
-        font-size: 1.1rem;
-        color: #666;
-        margin-bottom: 2rem;
-    }
-    .result-box {
-        padding: 1.5rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-        text-align: center;
-        font-size: 1.2rem;
-        font-weight: 600;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# Header
-st.markdown('<p class="main-header">🚗 Accident Severity Detection System</p>', unsafe_allow_html=True)
-st.markdown('<p class="description">Upload an accident image to analyze and classify damage severity</p>', unsafe_allow_html=True)
-
-# Sidebar Information
-with st.sidebar:
-    st.header("ℹ About")
-    st.info("""
-    *Severity Levels:*
-    - 🟢 Minor Damage
-    - 🟡 Moderate Damage
-    - 🔴 Severe Crash
-    
-    *Supported Formats:*
-    JPG, PNG, JPEG
-    
-    *Max File Size:*
-    10 MB
-    """)
-    
-    st.header("📊 Quick Stats")
-    st.metric("Model Accuracy", "94.2%")
-    st.metric("Total Predictions", "1,247")
-    st.metric("Processing Speed", "1.8s")
-    
-    st.markdown("---")
-    st.caption("💡 Tip: Upload clear, well-lit images for best results")
-
-# Main Content Area
-st.divider()
-
-# File Uploader
-uploaded_file = st.file_uploader(
-    "📤 Choose an accident image",
-    type=["jpg", "jpeg", "png"],
-    help="Upload a clear image of the accident scene"
-)
-
-if uploaded_file is not None:
-    # Load image
-    image = Image.open(uploaded_file)
-    
-    # Validate image
-    is_valid, message = validate_image(image)
-    
-    if not is_valid:
-        st.error(message)
+import streamlit as st
+from utils import normalize_into
+from severity_content import SEVERITY_DETAILS, SEVERITY_RECOMMENDATIONS
+
+
+# Trained Keras model and its Float16 TFLite conversion
+MODEL_PATH = os.path.join('models', 'accident_model.h5')
+TFLITE_MODEL_PATH = os.path.join('models', 'accident_model.fp16.tflite')
+
+# XNNPACK delegate library and inference thread count
+XNNPACK_DELEGATE = 'libxnnpack_delegate.so'
+NUM_THREADS = min(4, os.cpu_count() or 1)
+
+# The cached interpreter is shared by all session threads
+_interpreter_lock = threading.Lock()
+
+# Class labels (must match training label order)
+SEVERITY_CLASSES = [
+    "🟢 Minor Damage",
+    "🟡 Moderate Damage",
+    "🔴 Severe Crash"
+]
+
+
+def convert_to_tflite(model_path=MODEL_PATH, output_path=TFLITE_MODEL_PATH):
+    """
+    Convert the trained Keras model to a Float16 TFLite flatbuffer
+
+    Args:
+        model_path (str): Path to a .h5 file or SavedModel directory
+        output_path (str): Destination of the .tflite file
+
+    Returns:
+        str: Path of the written flatbuffer
+
+    Note:
+        Float16 halves the model size with negligible accuracy loss.
+        Full int8 quantization is deliberately avoided: on x86 CPUs it
+        is frequently slower than float32.
+    """
+
+    import tensorflow as tf
+
+    if os.path.isdir(model_path):
+        converter = tf.lite.TFLiteConverter.from_saved_model(model_path)
     else:
-        # Display uploaded image
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.subheader("📷 Uploaded Image")
-            st.image(image)
-            
-            # Show image metadata in expander
-            with st.expander("📊 Image Details"):
-                metadata = get_image_metadata(image)
-                st.write(f"*Dimensions:* {metadata['width']} x {metadata['height']} px")
-                st.write(f"*Format:* {metadata['format']}")
-                st.write(f"*Mode:* {metadata['mode']}")
-                st.write(f"*Aspect Ratio:* {metadata['aspect_ratio']}")
-                st.write(f"*Megapixels:* {metadata['megapixels']} MP")
-        
-        with col2:
-            st.subheader("🔍 Analysis Results")
-            
-            # Processing indicator
-            with st.spinner("Analyzing image..."):
-                # Preprocess image
-                processed_img = preprocess_image(image)
-                
-                # Get prediction
-                severity_class, confidence = predict_severity(processed_img)
-                
-                # Get detailed analysis
-                details = get_detailed_analysis(severity_class)
-            
-            # Display results with color coding
-            if "Minor" in severity_class:
-                st.success(f"*Severity Level:* {severity_class}")
-            elif "Moderate" in severity_class:
-                st.warning(f"*Severity Level:* {severity_class}")
-            else:
-                st.error(f"*Severity Level:* {severity_class}")
-            
-            # Confidence score
-            st.metric(
-                label="Confidence Score",
-                value=f"{confidence:.1f}%",
-                delta=f"{confidence - 80:.1f}% above threshold"
-            )
-            
-            # Progress bar for confidence
-            st.progress(confidence / 100)
-            
-            # Detailed information
-            st.divider()
-            
-            col_a, col_b = st.columns(2)
-            with col_a:
-                st.metric("Repair Time", details['repair_time'])
-            with col_b:
-                st.metric("Cost Estimate", details['cost_range'])
-            
-            st.metric(
-                "Insurance Claim", 
-                "Recommended" if details['insurance_recommended'] else "Optional"
-            )
-        
-        # Full-width recommendations section
-        st.divider()
-        st.subheader("💡 Recommended Actions")
-        
-        # Get recommendations
-        recommendations = get_recommendations(severity_class)
-        
-        # Display based on severity
-        if "Severe" in severity_class:
-            st.error("⚠ *CRITICAL DAMAGE DETECTED*")
-            for rec in recommendations:
-                st.markdown(f"- {rec}")
-            
-            st.warning("""
-            *Additional Notes:*
-            - This is a severe accident requiring immediate attention
-            - Total vehicle loss is possible
-            - Professional assessment is mandatory
-            """)
-            
-        elif "Moderate" in severity_class:
-            st.warning("⚠ *SIGNIFICANT DAMAGE DETECTED*")
-            for rec in recommendations:
-                st.markdown(f"- {rec}")
-            
-            st.info("""
-            *Additional Notes:*
-            - Professional inspection highly recommended
-            - Insurance claim process should begin soon
-            - Vehicle may need extended repair time
-            """)
-            
+        keras_model = tf.keras.models.load_model(model_path)
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+    return output_path
+
+
+@st.cache_resource
+def load_interpreter(model_path=TFLITE_MODEL_PATH):
+    """
+    Load the TFLite interpreter once per server process
+
+    Args:
+        model_path (str): Path to the .tflite flatbuffer
+
+    Returns:
+        tf.lite.Interpreter: Interpreter with tensors allocated
+
+    Note:
+        Runs on XNNPACK's vectorized kernels (AVX on x86, NEON on ARM)
+        with a fixed thread count instead of the reference kernels.
+    """
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"TFLite model not found at {model_path}. "
+            f"Run 'python model.py' to convert {MODEL_PATH}"
+        )
+
+    import tensorflow as tf
+
+    # Prefer the standalone XNNPACK delegate; stock TF builds otherwise
+    # apply XNNPACK by default, so falling back is not a slow path
+    try:
+        delegates = [tf.lite.experimental.load_delegate(
+            XNNPACK_DELEGATE,
+            options={'num_threads': NUM_THREADS}
+        )]
+    except (ValueError, OSError):
+        delegates = None
+
+    interpreter = tf.lite.Interpreter(
+        model_path=model_path,
+        num_threads=NUM_THREADS,
+        experimental_delegates=delegates
+    )
+    interpreter.allocate_tensors()
+
+    return interpreter
+
+
+def _write_input(input_view, images):
+    """Write preprocessed float or resized uint8 images into the input tensor"""
+
+    for slot, image in zip(input_view, images):
+        image = np.reshape(image, slot.shape)
+        if image.dtype == np.uint8:
+            # Normalize straight into the interpreter-owned buffer
+            normalize_into(image, slot)
         else:
-            st.success("✅ *MINOR DAMAGE - MANAGEABLE*")
-            for rec in recommendations:
-                st.markdown(f"- {rec}")
-            
-            st.info("""
-            *Additional Notes:*
-            - Simple repairs can be handled locally
-            - Consider cost vs. insurance deductible
-            - Quick turnaround time expected
-            """)
-        
-        # Additional Analysis Section
-        st.divider()
-        st.subheader("📈 Detailed Analysis")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("*Severity Level*")
-            st.write(f"Level {details['severity_level']}/3")
-            st.progress(details['severity_level'] / 3)
-        
-        with col2:
-            st.markdown("*Confidence Level*")
-            if confidence >= 90:
-                st.write("Very High")
-            elif confidence >= 80:
-                st.write("High")
-            elif confidence >= 70:
-                st.write("Moderate")
-            else:
-                st.write("Low")
-            st.progress(confidence / 100)
-        
-        with col3:
-            st.markdown("*Priority*")
-            if details['severity_level'] == 3:
-                st.write("🔴 Critical")
-            elif details['severity_level'] == 2:
-                st.write("🟡 High")
-            else:
-                st.write("🟢 Normal")
-        
-        # Download/Export Options
-        st.divider()
-        
-        col_x, col_y, col_z = st.columns(3)
-        
-        with col_x:
-            if st.button("📄 Generate Report", use_container_width=True):
-                st.info("PDF report generation coming soon!")
-        
-        with col_y:
-            if st.button("📧 Email Results", use_container_width=True):
-                st.info("Email feature coming soon!")
-        
-        with col_z:
-            if st.button("💾 Save Analysis", use_container_width=True):
-                st.info("Save feature coming soon!")
-
-else:
-    # Instructions when no image uploaded
-    st.info("👆 Please upload an accident image to begin analysis")
-    
-    # How to use section
-    with st.expander("📖 How to use this app"):
-        st.markdown("""
-        ### Step-by-Step Guide:
-        
-        1. *Upload Image:* Click the upload button above and select an accident photo
-        2. *Wait for Analysis:* The AI model will process the image (takes ~2 seconds)
-        3. *View Results:* Check the severity classification and confidence score
-        4. *Read Recommendations:* Follow the suggested next steps based on severity
-        5. *Take Action:* Contact appropriate services as recommended
-        
-        ### Tips for Best Results:
-        - Use clear, well-lit images
-        - Capture the damaged area from multiple angles
-        - Avoid blurry or dark photos
-        - Image should show the damage clearly
-        - Supported formats: JPG, PNG, JPEG (max 10MB)
-        """)
-    
-    # Sample Results Preview
-    with st.expander("📊 What results look like"):
-        st.markdown("""
-        After uploading an image, you'll see:
-        
-        ✅ *Severity Classification* (Minor/Moderate/Severe)  
-        ✅ *Confidence Score* (How sure the AI is)  
-        ✅ *Repair Time Estimate*  
-        ✅ *Cost Range Estimate*  
-        ✅ *Insurance Recommendation*  
-        ✅ *Detailed Action Steps*  
-        ✅ *Priority Level*  
-        """)
-
-# Footer
-st.divider()
-
-col_foot1, col_foot2, col_foot3 = st.columns(3)
-
-with col_foot1:
-    st.caption("🔒 Secure & Private")
-
-with col_foot2:
-    st.caption("🚀 Fast Processing")
-
-with col_foot3:
-    st.caption("🎯 94.2% Accurate")
-
-st.caption("💻 Built with Streamlit | Developed by Saurabh Kant Mishra | © 2024")
+            np.copyto(slot, image)
+
+
+def _run_inference(images):
+    """Run the interpreter on N images, resizing its input batch if needed"""
+
+    interpreter = load_interpreter()
+
+    with _interpreter_lock:
+        input_details = interpreter.get_input_details()[0]
+        batch_shape = (len(images),) + tuple(input_details['shape'][1:])
+        if tuple(input_details['shape']) != batch_shape:
+            interpreter.resize_tensor_input(input_details['index'], batch_shape)
+            interpreter.allocate_tensors()
+
+        # The interpreter's own input tensor is the reused buffer; the view
+        # must be released before invoke()
+        input_view = interpreter.tensor(input_details['index'])()
+        _write_input(input_view, images)
+        del input_view
+
+        interpreter.invoke()
+
+        output_details = interpreter.get_output_details()[0]
+        return interpreter.get_tensor(output_details['index'])
+
+
+def _decode_prediction(prediction):
+    """Turn one row of class probabilities into (severity_class, confidence)"""
+
+    class_idx = int(np.argmax(prediction))
+    confidence = float(prediction[class_idx] * 100)
+
+    return SEVERITY_CLASSES[class_idx], confidence
+
+
+def predict_severity(image_array):
+    """
+    Predict accident severity for a preprocessed image
+
+    Args:
+        image_array (np.ndarray): Preprocessed float32 image of shape
+            (1, 224, 224, 3), or a uint8 (224, 224, 3) image from
+            resize_for_model, normalized directly into the input tensor
+
+    Returns:
+        tuple: (severity_class, confidence_percent)
+    """
+
+    predictions = _run_inference([image_array])
+
+    return _decode_prediction(predictions[0])
+
+
+def predict_severity_batch(image_arrays):
+    """
+    Predict accident severity for several images with one interpreter call
+
+    Args:
+        image_arrays (list): Images accepted by predict_severity
+
+    Returns:
+        list: (severity_class, confidence_percent) per image
+    """
+
+    if not image_arrays:
+        return []
+
+    predictions = _run_inference(image_arrays)
+
+    return [_decode_prediction(prediction) for prediction in predictions]
+
+
+def _severity_key(severity_class):
+    """Map a display label such as '🟡 Moderate Damage' to its lookup key"""
+
+    for key in SEVERITY_DETAILS:
+        if key in severity_class:
+            return key
+    raise ValueError(f"Unknown severity class: {severity_class}")
+
+
+def get_detailed_analysis(severity_class):
+    """
+    Get repair and insurance details for a severity class
+
+    Args:
+        severity_class (str): Predicted class label
+
+    Returns:
+        dict: severity_level, repair_time, cost_range, insurance_recommended
+    """
+
+    return dict(SEVERITY_DETAILS[_severity_key(severity_class)])
+
+
+def get_recommendations(severity_class):
+    """
+    Get recommended actions for a severity class
+
+    Args:
+        severity_class (str): Predicted class label
+
+    Returns:
+        list: Recommended action strings
+    """
+
+    return list(SEVERITY_RECOMMENDATIONS[_severity_key(severity_class)])
+
+
+if __name__ == "__main__":
+    print(f"Wrote {convert_to_tflite()}")
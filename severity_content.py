@@ -0,0 +1,58 @@
+"""
+Per-Severity Content for the Results Panel
+Repair estimates and recommended actions shown alongside each prediction
+
+PLACEHOLDER DATA: the repair times, cost ranges and recommended actions
+below are illustrative values, not vetted guidance. They have not been
+reviewed by insurance, repair or emergency-response professionals and
+must be replaced before the app is used for real decisions.
+"""
+
+
+# Per-class analysis shown in the results panel
+# PLACEHOLDER: illustrative values, not real repair or cost data
+SEVERITY_DETAILS = {
+    "Minor": {
+        "severity_level": 1,
+        "repair_time": "1-3 days",
+        "cost_range": "$500 - $2,000",
+        "insurance_recommended": False
+    },
+    "Moderate": {
+        "severity_level": 2,
+        "repair_time": "1-2 weeks",
+        "cost_range": "$2,000 - $8,000",
+        "insurance_recommended": True
+    },
+    "Severe": {
+        "severity_level": 3,
+        "repair_time": "3+ weeks",
+        "cost_range": "$8,000+",
+        "insurance_recommended": True
+    }
+}
+
+# Suggested next steps per severity
+# PLACEHOLDER: not vetted safety, medical or insurance guidance
+SEVERITY_RECOMMENDATIONS = {
+    "Minor": [
+        "Document the damage with photos from several angles",
+        "Get a quote from a local body shop",
+        "Compare repair cost against your insurance deductible",
+        "Schedule the repair at your convenience"
+    ],
+    "Moderate": [
+        "Move to a safe location and check everyone for injuries",
+        "Document the scene and exchange details with other parties",
+        "Notify your insurance provider and start a claim",
+        "Have the vehicle inspected by a certified mechanic",
+        "Avoid driving until the vehicle is declared safe"
+    ],
+    "Severe": [
+        "Call emergency services immediately",
+        "Do not move injured persons unless in danger",
+        "Report the accident to the police",
+        "Contact your insurance provider as soon as possible",
+        "Arrange towing - the vehicle should not be driven"
+    ]
+}
@@ -3,9 +3,44 @@ Utility Functions for Image Processing
 Handles preprocessing, augmentation, and validation
 """
 
-import numpy as np
-from PIL import Image
+import functools
 import io
+import numpy as np
+from PIL import ExifTags, Image, ImageOps
+
+
+# Lookup table mapping uint8 pixel values to normalized float32 in [0, 1]
+_NORM_LUT = np.arange(256, dtype=np.float32) / 255.0
+
+
+def normalize_into(img_array, out):
+    """
+    Normalize a uint8 (H, W, 3) image to float32 in [0, 1], written into out
+    
+    Args:
+        img_array (np.ndarray): uint8 image, e.g. from resize_for_model
+        out (np.ndarray): float32 destination of the same shape, such as a
+            slot of the interpreter's input tensor
+    
+    Returns:
+        np.ndarray: out
+    """
+    
+    import cv2
+    
+    # Single LUT pass written straight into out, no intermediate arrays
+    cv2.LUT(img_array, _NORM_LUT, dst=out)
+    
+    return out
+
+
+def _normalize_to_batch(img_array):
+    """Normalize a uint8 (H, W, 3) image into a new (1, H, W, 3) float32 batch"""
+    
+    batch = np.empty((1,) + img_array.shape, dtype=np.float32)
+    normalize_into(img_array, batch[0])
+    
+    return batch
 
 
 def preprocess_image(image, target_size=(224, 224)):
@@ -20,47 +55,153 @@ def preprocess_image(image, target_size=(224, 224)):
         np.ndarray: Preprocessed image array ready for prediction
     
     Processing Steps:
-        1. Convert to RGB format
-        2. Resize to target dimensions
+        1. Apply EXIF orientation and convert to RGB (grayscale kept)
+        2. Resize to target dimensions (via preprocess_image_array)
         3. Normalize pixel values to [0, 1]
         4. Add batch dimension
     
+    Note:
+        For a JPEG that is not yet loaded this calls image.draft(), which
+        modifies the passed image in place: its size and pixels drop to
+        1/2, 1/4 or 1/8 scale. Read metadata first, or pass a separately
+        opened image if the full-resolution original is still needed.
+    
     Example:
         >>> from PIL import Image
         >>> img = Image.open('accident.jpg')
+        >>> metadata = get_image_metadata(img)  # before draft shrinks img
         >>> processed = preprocess_image(img)
         >>> print(processed.shape)  # (1, 224, 224, 3)
     """
     
     try:
-        # Ensure RGB format (remove alpha channel if present)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Resize to model input size
-        image = image.resize(target_size, Image.Resampling.LANCZOS)
-        
-        # Convert to numpy array
-        img_array = np.array(image, dtype=np.float32)
+        # Let libjpeg decode at a reduced scale (no-op if already loaded
+        # or not a JPEG); this resizes the caller's image, see Note
+        image.draft('RGB', target_size)
         
-        # Normalize pixel values to [0, 1]
-        img_array = img_array / 255.0
-        
-        # Add batch dimension: (224, 224, 3) -> (1, 224, 224, 3)
-        img_array = np.expand_dims(img_array, axis=0)
+        return preprocess_image_array(_pil_to_array(image), target_size)
+    
+    except Exception as e:
+        raise ValueError(f"Image preprocessing failed: {str(e)}")
+
+
+def _pil_to_array(image):
+    """
+    Convert a PIL image to the array layout decode_image produces
+    
+    Applies the EXIF orientation, as OpenCV's decoder does, and drops
+    alpha. Grayscale stays single-channel and is expanded to RGB only after
+    resizing.
+    """
+    
+    if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    return np.asarray(image)
+
+
+def decode_image(image_bytes, min_size=None):
+    """
+    Decode uploaded image bytes once into an RGB array using OpenCV
+    
+    Args:
+        image_bytes (bytes): Raw uploaded file contents (JPG/PNG)
+        min_size (tuple): Optional (width, height) the decoded array must
+            still cover. Like Image.draft, JPEGs are then decoded directly
+            at 1/2, 1/4 or 1/8 scale where possible
+    
+    Returns:
+        np.ndarray: uint8 array of shape (height, width, 3), alpha dropped
+    """
+    
+    import cv2
+    
+    flag = cv2.IMREAD_COLOR
+    if min_size is not None:
+        # Header-only read for the format and full-resolution dimensions
+        header = Image.open(io.BytesIO(image_bytes))
+        width, height = header.size
         
-        return img_array
+        # Only libjpeg decodes at reduced scale; for other formats OpenCV
+        # decodes in full and then decimates, which just aliases
+        # MPO is a JPEG with embedded previews; libjpeg decodes it the same way
+        if header.format in ('JPEG', 'MPO'):
+            for scale, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                        (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                        (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if width // scale >= min_size[0] and height // scale >= min_size[1]:
+                    flag = reduced_flag
+                    break
+    
+    buf = np.frombuffer(image_bytes, dtype=np.uint8)
+    img_array = cv2.imdecode(buf, flag)
+    if img_array is None:
+        raise ValueError("Image decoding failed: unsupported or corrupt data")
+    
+    cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB, dst=img_array)
+    
+    return img_array
+
+
+def resize_for_model(img_array, target_size=(224, 224)):
+    """
+    Resize a decoded RGB array to the model input size using OpenCV
+    
+    Args:
+        img_array (np.ndarray): uint8 RGB (or grayscale) array from decode_image
+        target_size (tuple): Target dimensions (height, width)
+    
+    Returns:
+        np.ndarray: uint8 array of shape (224, 224, 3). predict_severity
+            normalizes it directly into the interpreter's input tensor
+    
+    Note:
+        This is the single definition of the model input geometry; every
+        preprocessing entry point goes through it.
+    """
+    
+    import cv2
+    
+    try:
+        resized = cv2.resize(img_array, target_size, interpolation=cv2.INTER_AREA)
+        if resized.ndim == 2:
+            resized = cv2.cvtColor(resized, cv2.COLOR_GRAY2RGB)
+        return resized
     
     except Exception as e:
         raise ValueError(f"Image preprocessing failed: {str(e)}")
 
 
-def validate_image(image):
+def preprocess_image_array(img_array, target_size=(224, 224)):
+    """
+    Preprocess a decoded RGB array for model input using OpenCV
+    
+    Args:
+        img_array (np.ndarray): uint8 RGB array from decode_image
+        target_size (tuple): Target dimensions (height, width)
+    
+    Returns:
+        np.ndarray: Preprocessed image array ready for prediction
+    
+    Processing Steps:
+        1. Resize to target dimensions (area interpolation)
+        2. Normalize pixel values to [0, 1] via lookup table
+        3. Add batch dimension
+    """
+    
+    return _normalize_to_batch(resize_for_model(img_array, target_size))
+
+
+def validate_image(image, uploaded_size_bytes):
     """
     Validate uploaded image meets requirements
     
     Args:
         image (PIL.Image): Image to validate
+        uploaded_size_bytes (int): Size of the uploaded file in bytes
     
     Returns:
         tuple: (is_valid, error_message)
@@ -80,16 +221,10 @@ def validate_image(image):
     if image.mode not in ['RGB', 'RGBA', 'L']:
         return False, f"❌ Unsupported color mode: {image.mode}"
     
-    # Check file size (if available)
-    try:
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        size_mb = len(img_byte_arr.getvalue()) / (1024 * 1024)
-        
-        if size_mb > 10:
-            return False, f"❌ File too large: {size_mb:.2f}MB (max: 10MB)"
-    except:
-        pass  # Skip size check if fails
+    # Check file size
+    size_mb = uploaded_size_bytes / (1024 * 1024)
+    if size_mb > 10:
+        return False, f"❌ File too large: {size_mb:.2f}MB (max: 10MB)"
     
     return True, "✅ Image validated successfully"
 
@@ -131,26 +266,74 @@ def enhance_image(image, brightness=1.0, contrast=1.0, sharpness=1.0):
     
     Returns:
         PIL.Image: Enhanced image
+    
+    Example:
+        >>> from PIL import ImageEnhance
+        >>> img = Image.new('RGB', (8, 8), (200, 120, 40))
+        >>> ours = enhance_image(img, brightness=2.0, contrast=0.5)
+        >>> ref = ImageEnhance.Brightness(img).enhance(2.0)
+        >>> ref = ImageEnhance.Contrast(ref).enhance(0.5)
+        >>> np.array_equal(np.asarray(ours), np.asarray(ref))
+        True
+        >>> noisy = Image.effect_noise((16, 16), 64).convert('RGB')
+        >>> ours = np.asarray(enhance_image(noisy, sharpness=2.0), dtype=int)
+        >>> ref = np.asarray(ImageEnhance.Sharpness(noisy).enhance(2.0), dtype=int)
+        >>> int(np.abs(ours - ref).max()) <= 1
+        True
     """
     
-    from PIL import ImageEnhance
+    import cv2
+    
+    if brightness == 1.0 and contrast == 1.0 and sharpness == 1.0:
+        return image
     
-    # Apply brightness adjustment
-    if brightness != 1.0:
-        enhancer = ImageEnhance.Brightness(image)
-        image = enhancer.enhance(brightness)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGB')
     
-    # Apply contrast adjustment
-    if contrast != 1.0:
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(contrast)
+    img_array = np.asarray(image)
+    if image.mode == 'RGBA':
+        color = np.ascontiguousarray(img_array[..., :3])
+    else:
+        color = img_array
+    
+    # Apply brightness then contrast as one 256-entry LUT, reproducing
+    # ImageEnhance: each step is a float blend truncated and clipped to uint8
+    if brightness != 1.0 or contrast != 1.0:
+        levels = np.arange(256, dtype=np.float32)
+        lut = np.clip(np.float32(brightness) * levels, 0, 255).astype(np.uint8)
+        
+        if contrast != 1.0:
+            # Contrast pivots on the rounded luma mean of the brightened image,
+            # taken from per-channel histograms mapped through the brightness LUT
+            channels = [0] if color.ndim == 2 else [0, 1, 2]
+            weights = [1.0] if color.ndim == 2 else [0.299, 0.587, 0.114]
+            mean = 0.0
+            for channel, weight in zip(channels, weights):
+                hist = cv2.calcHist([color], [channel], None, [256], [0, 256]).ravel()
+                mean += weight * float(hist @ lut) / hist.sum()
+            pivot = np.float32(int(mean + 0.5))
+            
+            lut = pivot + np.float32(contrast) * (lut.astype(np.float32) - pivot)
+            lut = np.clip(lut, 0, 255).astype(np.uint8)
+        
+        color = cv2.LUT(color, lut)
     
-    # Apply sharpness adjustment
+    # Apply sharpness as one 3x3 kernel: blend of identity and PIL's SMOOTH.
+    # Interior pixels may differ from ImageEnhance by 1 level (rounding)
     if sharpness != 1.0:
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(sharpness)
+        kernel = np.full((3, 3), (1.0 - sharpness) / 13.0, dtype=np.float32)
+        kernel[1, 1] = (1.0 - sharpness) * 5.0 / 13.0 + sharpness
+        sharpened = cv2.filter2D(color, -1, kernel)
+        
+        # ImageEnhance leaves the outer 1-px border unfiltered
+        sharpened[[0, -1]] = color[[0, -1]]
+        sharpened[:, [0, -1]] = color[:, [0, -1]]
+        color = sharpened
+    
+    if image.mode == 'RGBA':
+        color = np.dstack([color, img_array[..., 3]])
     
-    return image
+    return Image.fromarray(color, image.mode)
 
 
 def create_thumbnail(image, max_size=(300, 300)):
@@ -158,16 +341,131 @@ def create_thumbnail(image, max_size=(300, 300)):
     Create thumbnail version of image for display
     
     Args:
-        image (PIL.Image): Input image
+        image (np.ndarray | PIL.Image): uint8 RGB array from decode_image,
+            or a PIL image
         max_size (tuple): Maximum dimensions
     
     Returns:
-        PIL.Image: Thumbnail image
+        PIL.Image: Thumbnail image, RGBA if a PIL input has transparency
+    """
+    
+    import cv2
+    
+    if isinstance(image, Image.Image) and image.has_transparency_data:
+        # Keep alpha; Pillow resizes RGBA premultiplied, so no dark fringes
+        thumb = ImageOps.exif_transpose(image).convert('RGBA')
+        thumb.thumbnail(max_size, Image.Resampling.BOX)
+        return thumb
+    
+    img_array = image if isinstance(image, np.ndarray) else _pil_to_array(image)
+    
+    height, width = img_array.shape[:2]
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    if scale < 1.0:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        img_array = cv2.resize(img_array, size, interpolation=cv2.INTER_AREA)
+    
+    return Image.fromarray(img_array)
+
+
+def encode_for_display(image, quality=80):
+    """
+    Encode an image for the browser as JPEG
+    
+    Args:
+        image (PIL.Image): Image to encode, typically a thumbnail
+        quality (int): JPEG quality
+    
+    Returns:
+        bytes: Encoded image, ready for st.image
+    
+    Note:
+        st.image passes JPEG and PNG bytes through untouched but decodes and
+        re-encodes any other format on every rerun. Images with
+        transparency are kept as PNG, which Streamlit also expects for them.
+    """
+    
+    buf = io.BytesIO()
+    
+    if 'A' in image.mode or 'transparency' in image.info:
+        image.save(buf, format='PNG')
+        return buf.getvalue()
+    
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    image.save(buf, format='JPEG', quality=quality)
+    
+    return buf.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def _fused_moments_kernel():
+    """Import Numba and build the stats kernel on first use; None without numba"""
+    
+    try:
+        from numba import njit, prange
+    except ImportError:  # Fall back to a NumPy histogram
+        return None
+    
+    @njit(parallel=True, cache=True)
+    def _fused_moments(flat):
+        """Integer sum, sum of squares, min and max in a single parallel pass"""
+        total = 0
+        total_sq = 0
+        lo = 255
+        hi = 0
+        for i in prange(flat.size):
+            v = np.int64(flat[i])
+            total += v
+            total_sq += v * v
+            lo = min(lo, v)
+            hi = max(hi, v)
+        return total, total_sq, lo, hi
+    
+    return _fused_moments
+
+
+def _image_moments(img_array):
+    """
+    Compute mean, std, min and max of an image array
+    
+    uint8 images are reduced with exact integer accumulators, fused into one
+    pass with Numba, else via a 256-bin cv2.calcHist histogram read straight
+    from the uint8 pixels. Neither path makes a widened copy of the image.
+    Other dtypes use plain NumPy reductions.
     """
     
-    image_copy = image.copy()
-    image_copy.thumbnail(max_size, Image.Resampling.LANCZOS)
-    return image_copy
+    if img_array.dtype != np.uint8:
+        return (float(np.mean(img_array)), float(np.std(img_array)),
+                int(np.min(img_array)), int(np.max(img_array)))
+    
+    flat = np.ascontiguousarray(img_array).ravel()
+    n = flat.size
+    
+    fused_moments = _fused_moments_kernel()
+    if fused_moments is not None:
+        total, total_sq, lo, hi = (int(v) for v in fused_moments(flat))
+    else:
+        import cv2
+        
+        # calcHist counts in float32, which is exact up to 2**24 per bin,
+        # so histogram in chunks of that size and sum the counts as integers
+        counts = np.zeros(256, dtype=np.uint64)
+        for start in range(0, n, 1 << 24):
+            chunk = flat[start:start + (1 << 24)]
+            hist = cv2.calcHist([chunk], [0], None, [256], [0, 256])
+            counts += hist.ravel().astype(np.uint64)
+        levels = np.arange(256, dtype=np.uint64)
+        total = int(counts @ levels)
+        total_sq = int(counts @ (levels * levels))
+        present = np.flatnonzero(counts)
+        lo, hi = int(present[0]), int(present[-1])
+    
+    mean = total / n
+    variance = (total_sq * n - total * total) / (n * n)
+    
+    return mean, variance ** 0.5, lo, hi
 
 
 def calculate_image_stats(image):
@@ -175,19 +473,20 @@ def calculate_image_stats(image):
     Calculate statistical properties of image
     
     Args:
-        image (PIL.Image): Input image
+        image (PIL.Image | np.ndarray): Input image
     
     Returns:
         dict: Statistical metrics
     """
     
-    img_array = np.array(image)
+    img_array = np.asarray(image)
+    mean, std, lo, hi = _image_moments(img_array)
     
     stats = {
-        "mean_brightness": float(np.mean(img_array)),
-        "std_brightness": float(np.std(img_array)),
-        "min_value": int(np.min(img_array)),
-        "max_value": int(np.max(img_array)),
+        "mean_brightness": mean,
+        "std_brightness": std,
+        "min_value": lo,
+        "max_value": hi,
         "median": float(np.median(img_array))
     }
     